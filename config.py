@@ -1,18 +1,21 @@
 import os
 import logging
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import sys
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=2, timeout=30)
 
 Allowed_Origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 GPT_MODEL = "gpt-4.1-mini"
-PORT = os.getenv("PORT", 8000)
+PORT = int(os.getenv("PORT", 8000))
 HOST = os.getenv("HOST", "127.0.0.1")
+KEEP_ALIVE_TIMEOUT = int(os.getenv("KEEP_ALIVE_TIMEOUT", 15))
+# Max concurrent connections before uvicorn answers 503, unset for no limit
+LIMIT_CONCURRENCY = int(os.getenv("LIMIT_CONCURRENCY", 0)) or None
 X_BEARER_TOKEN = os.getenv("X_BEARER_TOKEN", "fkjgldfjgldjfglj")
 
 SHORT_TERM_MEMORY_LIMIT = 20
@@ -1,25 +1,44 @@
-from fastapi.responses import JSONResponse
-from fastapi import Request, FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import uvicorn
-from utils.mongo_service import  check_tweet_exists,update_user_agent, delete_user_agent, create_or_update_user_with_agent, save_combined_predictions, get_all_unique_x_influencers_ids, get_all_users, get_influencer_account_by_username, get_last_24h_predicted_tweets, get_user_agents,save_account_info , save_tweet
-from utils.x_api import get_token_price, get_user_info, get_user_tweets
-from utils.gpt_client import tweet_analysis, combined_predictions_analysis
-from datetime import datetime
-import time
+from utils.mongo_service import  ensure_indexes, find_existing_tweets, save_tweets_bulk,update_user_agent, delete_user_agent, create_or_update_user_with_agent, save_combined_predictions, get_cached_combined_analysis, save_combined_analysis_cache, get_all_unique_x_influencers_ids, get_all_users, get_users_agent_configs, get_influencer_account_by_username, get_last_24h_predicted_tweet_ids, get_last_24h_predicted_tweets, get_user_agents,save_account_info
+from utils.x_api import RateLimiter, close_http_client, get_user_info, get_user_tweets, user_info_rate_limited
+from utils.gpt_client import NO_SIGNAL_SUMMARY, has_prediction_signal, tweet_analysis, combined_predictions_analysis
+from utils.cache import TTLCache, SingleFlight
+from utils.models import AccountRefModel
+from datetime import datetime, timedelta, timezone
+import hashlib
+import json
 import logging
-from typing import Optional,Any
-from config import PORT, HOST, VERSION, Allowed_Origins
+from typing import Optional,Any, Dict, List, Union
+from config import PORT, HOST, KEEP_ALIVE_TIMEOUT, LIMIT_CONCURRENCY, VERSION, Allowed_Origins, client as openai_client
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.jobstores.mongodb import MongoDBJobStore
+from utils.db import MONGO_URI, MONGO_DB_NAME
 import asyncio
 
-scheduler = AsyncIOScheduler()
+# Seconds a job may start late before the run is skipped
+JOB_MISFIRE_GRACE_TIME = 600
+
+# Jobs live in Mongo so restarts keep their next run time
+scheduler = AsyncIOScheduler(
+    jobstores={
+        "default": MongoDBJobStore(
+            database=MONGO_DB_NAME,
+            collection="apscheduler_jobs",
+            host=MONGO_URI
+        )
+    }
+)
 
 app = FastAPI(
     title="Influencer Agent",
     description="Influencer Agent API",
-    version=VERSION
+    version=VERSION,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -41,63 +60,214 @@ class InfluencerSearchRequest(BaseModel):
     username: str
     walletAddress: Optional[str] = None
 
+class CreateUserAgentRequest(BaseModel):
+    walletAddress: str = Field(..., min_length=1)
+    agentName: str = Field(..., min_length=1)
+    accounts: List[AccountRefModel] = Field(default_factory=list)
+    categories: List[str] = Field(default_factory=list)
+
+class UpdateUserAgentRequest(BaseModel):
+    wallet: str = Field(..., min_length=1)
+    agent_name: str = Field(..., min_length=1)
+    new_agent_name: Optional[str] = None
+    add_accounts: Optional[List[Union[str, Dict[str, Any]]]] = None
+    remove_accounts: Optional[List[Union[str, Dict[str, Any]]]] = None
+    update_influences: Optional[Dict[str, float]] = None
+    categories: Optional[List[str]] = None
+
 BATCH_SIZE = 10
+# Concurrent OpenAI requests allowed while analyzing new tweets
+ANALYSIS_CONCURRENCY = 8
+COMBINED_ANALYSIS_CACHE_TTL = timedelta(hours=24)
+COMBINED_CHUNK_SIZE = 25
+COMBINED_CHUNK_CONCURRENCY = 5
+
+# (account_name, tweet_id) pairs already stored, so repeat polls skip the Mongo check
+seen_tweets = TTLCache(maxsize=10_000)
+
+# In-flight X API lookups by username for /influencer/search
+influencer_fetches = SingleFlight()
+
+# In-flight GPT analyses by (username, tweet id), so a tweet is never analyzed twice at once
+tweet_analyses = SingleFlight()
+
+# Bulk tweet writes still running in the background, drained on shutdown
+pending_saves: set = set()
+MAX_PENDING_SAVES = 50
 
 async def fetch_influencers_tweets() -> list:
     """
     Fetch only the most recent tweet for each influencer.
-    Returns tweets sorted newest first.
+    Each batch is fetched concurrently, checked against Mongo in one query
+    and saved in one bulk write.
     """
     ids = await get_all_unique_x_influencers_ids()
+    semaphore = asyncio.Semaphore(BATCH_SIZE)
+    analysis_semaphore = asyncio.Semaphore(ANALYSIS_CONCURRENCY)
+
+    async def limited_analysis(tweet):
+        async with analysis_semaphore:
+            return await tweet_analysis(tweet)
+
+    async def analyze(tweet):
+        if not has_prediction_signal(tweet):
+            logging.debug("No prediction signal in tweet %s, skipping GPT", tweet["id"])
+            return dict(NO_SIGNAL_SUMMARY)
+        key = (tweet["username"], tweet["id"])
+        return await tweet_analyses.do(key, lambda: limited_analysis(tweet))
+
+    # Rate-limit state shared by all concurrent fetches of this run
+    rate_limiter = RateLimiter()
+
+    async def fetch_latest_tweet(user_id):
+        """
+        Fetch the most recent tweet of one influencer, or None.
+        """
+        async with semaphore:
+            await rate_limiter.wait()
+            logging.debug("Fetching tweets for user ID: %s", user_id)
+            try:
+                tweets, headers = await get_user_tweets(user_id, max_results=5)
+                rate_limiter.update(headers)
+
+                # a tweet whose author is missing from includes has no username to key it by
+                tweets = [t for t in tweets if t.get("username")]
+                if not tweets:
+                    return None
+
+                # X returns fixed-format UTC ISO-8601 timestamps, which order lexicographically
+                return max(tweets, key=lambda t: t["created_at"])
+
+            except Exception as e:
+                logging.error("Error fetching tweets for ID %s: %s", user_id, e)
+                return None
 
     for i in range(0, len(ids), BATCH_SIZE):
         batch = ids[i:i+BATCH_SIZE]
+        # only pause when the remaining quota can't cover the whole batch
+        await rate_limiter.wait(len(batch))
+        results = await asyncio.gather(*(fetch_latest_tweet(u) for u in batch), return_exceptions=True)
+
+        latest_tweets = []
+        for user_id, result in zip(batch, results):
+            if isinstance(result, Exception):
+                logging.error("Error processing user ID %s: %s", user_id, result)
+            elif result:
+                latest_tweets.append(result)
+
+        new_tweets = await filter_new_tweets(latest_tweets)
+        if new_tweets:
+            analyses = await asyncio.gather(*(analyze(t) for t in new_tweets))
+            for tweet, analysis in zip(new_tweets, analyses):
+                logging.info("Tweet analysis result for %s: %s", tweet['username'], analysis)
+
+            # the next batch doesn't depend on this write, so it runs in the background
+            await schedule_tweet_save(
+                [(t['username'], t, analysis) for t, analysis in zip(new_tweets, analyses)]
+            )
+
+async def save_and_mark_seen(records: list):
+    saved = await save_tweets_bulk(records)
+    for key in saved.get("keys", []):
+        seen_tweets.set(key, True)
+
+async def schedule_tweet_save(records: list):
+    """
+    Start a bulk save without waiting for Mongo to acknowledge it.
+    Applies backpressure once MAX_PENDING_SAVES writes are in flight.
+    """
+    while len(pending_saves) >= MAX_PENDING_SAVES:
+        await asyncio.wait(pending_saves, return_when=asyncio.FIRST_COMPLETED)
 
-        for user_id in batch:
-            if not user_id or not str(user_id).isdigit():
-                logging.warning(f"Skipping invalid ID: {user_id}")
-                continue
-
-            print(f"Fetching tweets for user ID: {user_id}")
-            try:
-                tweets, headers = get_user_tweets(user_id, max_results=5)
-
-                #  rate limits
-                remaining = int(headers.get("x-rate-limit-remaining", 1))
-                reset_time = int(headers.get("x-rate-limit-reset", time.time() + 900))
-
-                if tweets:
-                    tweets.sort(
-                        key=lambda t: datetime.fromisoformat(
-                            t["created_at"].replace("Z", "+00:00")
-                        ),
-                        reverse=True
-                    )
-                    most_recent = tweets[0]
-
-                    res = await check_tweet_exists(most_recent['username'], most_recent['id'])
-                    if res.get("status") == "exists":
-                        logging.info(f"Tweet already exists for {most_recent['username']}")
-                        continue
-
-                    logging.info(f"New tweet found for {most_recent['username']}")
-                    tweet_analysis_result = await tweet_analysis(most_recent)
-                    logging.info(f"Tweet analysis result: {tweet_analysis_result}")
-                    await save_tweet(most_recent['username'], most_recent, tweet_analysis_result)
-
-                # If we are out of requests, wait until reset
-                if remaining == 0:
-                    sleep_for = reset_time - int(time.time())
-                    logging.warning(f"Rate limit reached. Sleeping {sleep_for}s...")
-                    await asyncio.sleep(sleep_for)
+    task = asyncio.create_task(save_and_mark_seen(records))
+    pending_saves.add(task)
+    task.add_done_callback(pending_saves.discard)
 
-            except Exception as e:
-                logging.error(f"Error fetching tweets for ID {user_id}: {e}")
+async def filter_new_tweets(tweets: list) -> list:
+    """
+    Drop tweets that are already stored, using the in-memory seen set first
+    and a single Mongo query for the rest.
+    """
+    unseen = []
+    for tweet in tweets:
+        if not tweet.get('username'):
+            logging.warning("Skipping tweet %s without username", tweet.get('id'))
+            continue
+        key = (tweet['username'].lower(), str(tweet['id']))
+        if key in seen_tweets:
+            logging.info("Tweet already exists for %s", tweet['username'])
+        else:
+            unseen.append((key, tweet))
+
+    existing = await find_existing_tweets([key for key, _ in unseen])
+
+    new_tweets = []
+    for key, tweet in unseen:
+        if key in existing:
+            seen_tweets.set(key, True)
+            logging.info("Tweet already exists for %s", tweet['username'])
+        else:
+            logging.info("New tweet found for %s", tweet['username'])
+            new_tweets.append(tweet)
+    return new_tweets
+
+def combined_analysis_input_hash(tweet_ids: list, users: list) -> str:
+    """
+    Fingerprint the inputs of the combined analysis: the predicted tweet ids
+    and the agents configured by users (fetched by GPT via get_all_users).
+    Users are the raw documents, so data that wouldn't validate still hashes.
+    """
+    tweet_ids = sorted(str(t) for t in tweet_ids)
+    agents = [{"wallet": u.get("walletAddress"), "agents": u.get("agents", [])} for u in users]
+    payload = json.dumps({"tweets": tweet_ids, "agents": agents}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
 
-        # After finishing one batch, wait for the next 15-min window
-        if i + BATCH_SIZE < len(ids):
-            logging.info("Batch finished. Sleeping 15 minutes for next window...")
-            await asyncio.sleep(900)            
+async def chunked_combined_predictions_analysis(tweets_cursor) -> dict:
+    """
+    Aggregate predictions in fixed-size chunks analyzed in parallel, then merge
+    the partial results with a single reduce call. Chunks are submitted while
+    the cursor is still being read, so Mongo I/O overlaps the GPT calls. Reading
+    pauses while COMBINED_CHUNK_CONCURRENCY chunks are in flight, so only those
+    chunks' documents (plus the partial results) are held in memory.
+    """
+    sem = asyncio.Semaphore(COMBINED_CHUNK_CONCURRENCY)
+
+    async def analyze_chunk(chunk):
+        try:
+            return await combined_predictions_analysis(chunk)
+        finally:
+            sem.release()
+
+    async def submit(chunk):
+        # backpressure: stop reading the cursor while all chunk slots are busy
+        await sem.acquire()
+        tasks.append(asyncio.ensure_future(analyze_chunk(chunk)))
+
+    tasks = []
+    chunk = []
+    async for doc in tweets_cursor:
+        chunk.append(doc)
+        if len(chunk) == COMBINED_CHUNK_SIZE:
+            await submit(chunk)
+            chunk = []
+    if chunk:
+        await submit(chunk)
+
+    results = await asyncio.gather(*tasks)
+    # the window can empty out between the tweet id query and this cursor
+    if not results:
+        return {"combined_predictions": []}
+    if len(results) == 1:
+        return results[0]
+
+    partials = [r for r in results if r.get("combined_predictions")]
+    logging.info("Combined analysis: %d/%d chunks produced predictions", len(partials), len(results))
+
+    if not partials:
+        return results[0]
+    if len(partials) == 1:
+        return partials[0]
+    return await combined_predictions_analysis(partials, mode="reduce")
 
 async def combined_prediction_analysis():
     """
@@ -106,89 +276,137 @@ async def combined_prediction_analysis():
     logging.info("Generating combined prediction")
 
     try:
-        tweets_data = await get_last_24h_predicted_tweets()
-        logging.info(f"Fetched {len(tweets_data)} tweets for analysis")
-
-        tweet_analysis = await combined_predictions_analysis(tweets_data)
+        tweet_ids = await get_last_24h_predicted_tweet_ids()
+        logging.info("Fetched %s tweets for analysis", len(tweet_ids))
+        if not tweet_ids:
+            logging.info("No predicted tweets in the window, skipping combined analysis")
+            return
+
+        # Same tweets and same agents produce the same aggregation, so reuse the last result
+        input_hash = combined_analysis_input_hash(tweet_ids, await get_users_agent_configs())
+        if await get_cached_combined_analysis(input_hash, COMBINED_ANALYSIS_CACHE_TTL):
+            logging.info("Prediction inputs unchanged since last run, skipping combined analysis")
+            return
+
+        tweet_analysis = await chunked_combined_predictions_analysis(get_last_24h_predicted_tweets())
         logging.info("Completed combined predictions analysis")
-        print(tweet_analysis)
+        logging.debug("Combined predictions: %s", tweet_analysis)
 
-        await save_combined_predictions(tweet_analysis)
+        saved = await save_combined_predictions(tweet_analysis)
+        # a failed save must not be cached, or the next runs would skip the analysis
+        if any(r.get("status") == "failed" for r in saved):
+            logging.error("Combined predictions were not saved, not caching the analysis")
+        elif "combined_predictions" in tweet_analysis:
+            await save_combined_analysis_cache(input_hash, tweet_analysis)
 
     except Exception as e:
-        logging.error(f"Error in combined_prediction_analysis: {e}", exc_info=True)   
+        logging.error("Error in combined_prediction_analysis: %s", e, exc_info=True)   
    
 def success_response(data: Any = None, message: str = "OK", http_code: int = 200):
-    return JSONResponse(
+    # Same shape as APIResponse, serialized once by orjson
+    return ORJSONResponse(
         status_code=http_code,
-        content=APIResponse(
-            status="success",
-            data=data,
-            message=message,
-            error=None,
-        ).dict()
+        content={
+            "status": "success",
+            "data": data,
+            "message": message,
+            "error": None,
+        }
     )
 
 def error_response(message: str, error: str = "BadRequest", http_code: int = 400):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=http_code,
-        content=APIResponse(
-            status="error",
-            data=None,
-            message=message,
-            error=error,
-        ).dict()
+        content={
+            "status": "error",
+            "data": None,
+            "message": message,
+            "error": error,
+        }
+    )
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    """Invalid request bodies get the usual error envelope instead of FastAPI's 422 detail list."""
+    errors = exc.errors()
+    if errors:
+        field = ".".join(str(part) for part in errors[0]["loc"] if part != "body")
+        message = f"{field}: {errors[0]['msg']}" if field else errors[0]["msg"]
+    else:
+        message = "Invalid request"
+    logging.info("Request validation failed for %s: %s", request.url.path, errors)
+    return error_response(message, error="ValidationError", http_code=400)
+
+def schedule_interval_job(func, job_id: str, **interval):
+    """
+    Add or refresh an interval job. If the job store already holds the job,
+    its next run time is kept so a restart doesn't reset the interval;
+    a job scheduled for the first time runs right away in the background.
+    """
+    existing = scheduler.get_job(job_id)
+    if existing and existing.next_run_time:
+        next_run_time = existing.next_run_time
+    else:
+        next_run_time = datetime.now(timezone.utc)
+
+    # One instance at a time: an overlapping fetch would share the same X API rate limit
+    scheduler.add_job(
+        func,
+        "interval",
+        id=job_id,
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=JOB_MISFIRE_GRACE_TIME,
+        next_run_time=next_run_time,
+        **interval
     )
 
 @app.on_event("startup")
 async def startup_event():
-    logging.info(f"Running on server. App version is {VERSION}")
-    # await fetch_influencers_tweets()
-    # await combined_prediction_analysis()
-    # Add jobs
-    scheduler.add_job(fetch_influencers_tweets, "interval", hours=1)
-    logging.info("Scheduled: fetch_influencers_tweets every 1 hour")
-
-    scheduler.add_job(combined_prediction_analysis, "interval", hours=12)
-    logging.info("Scheduled: combined_prediction_analysis every 12 hours")
+    logging.info("Running on server. App version is %s", VERSION)
+    await ensure_indexes()
 
-    # Start scheduler 
+    # Start scheduler first so persisted jobs can be looked up
     if not scheduler.running:
         scheduler.start()
         logging.info("Scheduler started")
 
+    # Add jobs
+    schedule_interval_job(fetch_influencers_tweets, "fetch_influencers_tweets", hours=1)
+    logging.info("Scheduled: fetch_influencers_tweets every 1 hour")
+
+    schedule_interval_job(combined_prediction_analysis, "combined_prediction_analysis", hours=12)
+    logging.info("Scheduled: combined_prediction_analysis every 12 hours")
+
 @app.on_event("shutdown")
 async def shutdown_event():
     scheduler.shutdown()
     logging.info("Scheduler stopped")
+    if pending_saves:
+        logging.info("Waiting for %d pending tweet saves", len(pending_saves))
+        await asyncio.gather(*pending_saves, return_exceptions=True)
+    await close_http_client()
+    await openai_client.close()
 
 @app.post("/user/agent/create", response_model=APIResponse)
-async def create_user(request: Request):
+async def create_user(payload: CreateUserAgentRequest):
     """
     Create or update a user and link Twitter accounts to their wallet.
     """
     try:
-        body = await request.json()
-        logging.info(f"Create User Request: {body}")
-
-        wallet = body.get("walletAddress")
-        accounts = body.get("accounts", [])
-
-        if not wallet:
-            return error_response("walletAddress is required", error="ValidationError", http_code=400)
-        if not isinstance(accounts, list):
-            return error_response("accounts must be a list", error="ValidationError", http_code=400)
+        logging.info("Create User Request: %s", payload)
 
-        result = await create_or_update_user_with_agent(body)
+        result = await create_or_update_user_with_agent(payload.model_dump())
 
         return success_response(
-            data={"wallet": wallet, "user": result["user"]},
+            data={"wallet": payload.walletAddress, "user": result["user"]},
             message=f"User {result['status']} successfully"
         )
 
     except ValueError as error:
         # Business logic errors (e.g., agent already exists, account not found)
-        logging.error(f"Validation error: {error}")
+        logging.error("Validation error: %s", error)
         return error_response(str(error), error="Conflict", http_code=409)
 
     except Exception as error:
@@ -197,7 +415,7 @@ async def create_user(request: Request):
         return error_response("Internal Server Error", error="ServerError", http_code=500)
 
 @app.put("/user/agent/update")
-async def update_user_agent_endpoint(request: Request):
+async def update_user_agent_endpoint(payload: UpdateUserAgentRequest):
     """
     Update an existing agent of a user by wallet address.
     Expected JSON body example:
@@ -215,25 +433,16 @@ async def update_user_agent_endpoint(request: Request):
     }
     """
     try:
-        body = await request.json()
-        logging.info(f"Update User Agent Request: {body}")
-
-        wallet = body.get("wallet")
-        agent_name = body.get("agent_name")
-
-        if not wallet:
-            raise HTTPException(status_code=400, detail="wallet Address is required")
-        if not agent_name:
-            raise HTTPException(status_code=400, detail="agentName is required")
+        logging.info("Update User Agent Request: %s", payload)
 
         result = await update_user_agent(
-            wallet=wallet,
-            agent_name=agent_name,
-            new_agent_name=body.get("new_agent_name"),
-            add_accounts=body.get("add_accounts"),
-            remove_accounts=body.get("remove_accounts"),
-            update_influences=body.get("update_influences"),
-            categories=body.get("categories"),
+            wallet=payload.wallet,
+            agent_name=payload.agent_name,
+            new_agent_name=payload.new_agent_name,
+            add_accounts=payload.add_accounts,
+            remove_accounts=payload.remove_accounts,
+            update_influences=payload.update_influences,
+            categories=payload.categories,
         )
 
 
@@ -243,7 +452,7 @@ async def update_user_agent_endpoint(request: Request):
         )
     except ValueError as error:
         # Business logic errors (e.g., agent already exists, account not found)
-        logging.error(f"Validation error: {error}")
+        logging.error("Validation error: %s", error)
         return error_response(str(error), error="Conflict", http_code=409)
 
     except Exception as error:
@@ -275,7 +484,7 @@ async def delete_agent(wallet_address: str, agent_name: str):
         )
 
     except ValueError as error:
-        logging.error(f"Validation error: {error}")
+        logging.error("Validation error: %s", error)
         return error_response(str(error), error="Conflict", http_code=409)
 
     except Exception as error:
@@ -299,14 +508,16 @@ async def get_agents(walletAddress: str):
 
         agents = await get_user_agents(walletAddress)
 
-        return {
+        # returned as a response object so FastAPI skips jsonable_encoder over the whole
+        # aggregation (tweets included) and orjson serializes the documents directly
+        return ORJSONResponse({
             "status": "success",
             "data": agents,
             "messsage": "User agents fetched successfully",
             "error": None
-        }
+        })
     except ValueError as error:
-        logging.error(f"Error retrieving agents for wallet {walletAddress}: {error}")
+        logging.error("Error retrieving agents for wallet %s: %s", walletAddress, error)
         return error_response(str(error), error="Conflict", http_code=409)
 
     except Exception as error:
@@ -314,6 +525,25 @@ async def get_agents(walletAddress: str):
         logging.exception("Unexpected error occurred")
         return error_response("Internal Server Error", error="ServerError", http_code=500)
 
+async def fetch_and_save_influencer(username: str) -> dict:
+    """
+    Fetch an influencer from the X API and save it to the accounts collection.
+    """
+    logging.info("Fetching influencer from X API: %s", username)
+    influencer_data = await get_user_info(username)
+    logging.debug("X API user info: %s", influencer_data)
+    if influencer_data is None:
+        raise ValueError("Failed to fetch user info from X API")
+
+    # Extract user info
+    user_info = influencer_data.get("data")
+    if not user_info:
+        raise ValueError("No 'data' key in X API response")
+
+    # Save to MongoDB
+    await save_account_info(user_info)
+    return user_info
+
 @app.post("/influencer/search")
 async def search_influencer(payload: InfluencerSearchRequest):
     """
@@ -325,38 +555,28 @@ async def search_influencer(payload: InfluencerSearchRequest):
     username = payload.username.strip().lower()
     wallet = payload.walletAddress
 
-    logging.info(f"Searching influencer: username={username}, wallet={wallet}")
+    logging.info("Searching influencer: username=%s, wallet=%s", username, wallet)
 
     # 1. Check if influencer exists in DB
     try:
         influencer_doc = await get_influencer_account_by_username(username)
-        print(f"Influencer found in DB: {influencer_doc}")
+        logging.debug("Influencer lookup result: %s", influencer_doc)
         if influencer_doc:
-            logging.info(f"Influencer found in DB: {username}")
+            logging.info("Influencer found in DB: %s", username)
             return {
             "status": "success",
-            "data": influencer_doc.dict(),
+            "data": influencer_doc.model_dump(),
             "messsage": "influencer fetched successfully",
             "error": None
             }
 
     except Exception as db_error:
-        logging.error(f"Database lookup failed for {username}: {db_error}")
+        logging.error("Database lookup failed for %s: %s", username, db_error)
         return error_response("Database error during lookup", error="ServerError", http_code=500)
 
-    # 2. If not in DB, fetch from X API
+    # 2. If not in DB, fetch from X API (concurrent searches for the same username share one fetch)
     try:
-        logging.info(f"Fetching influencer from X API: {username}")
-        influencer_data = get_user_info(username)  # sync function returns dict
-        print(influencer_data)
-
-        # Extract user info
-        user_info = influencer_data.get("data")
-        if not user_info:
-            raise ValueError("No 'data' key in X API response")
-
-        # Save to MongoDB
-        await save_account_info(user_info)
+        user_info = await influencer_fetches.do(username, lambda: fetch_and_save_influencer(username))
 
         return {
             "status": "success",
@@ -365,11 +585,22 @@ async def search_influencer(payload: InfluencerSearchRequest):
             "error": None
         }
     except ValueError as error:
-        logging.error(f"Failed to fetch from X API for {username}: {error}")
+        logging.error("Failed to fetch from X API for %s: %s", username, error)
+        if user_info_rate_limited():
+            return error_response("X API rate limit reached, retry later", error="TooManyRequests", http_code=429)
         return error_response(str(error), error="Conflict", http_code=409)
     except Exception as error:
         logging.exception("Unexpected error occurred")
         return error_response("Internal Server Error", error="ServerError", http_code=500)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host=HOST, port=PORT)
+    # "auto" picks uvloop and httptools when installed (see requirements.txt)
+    uvicorn.run(
+        app,
+        host=HOST,
+        port=PORT,
+        loop="auto",
+        http="auto",
+        timeout_keep_alive=KEEP_ALIVE_TIMEOUT,
+        limit_concurrency=LIMIT_CONCURRENCY
+    )
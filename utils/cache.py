@@ -0,0 +1,71 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small in-process cache with per-entry expiry and LRU eviction.
+
+    Args:
+        ttl (float | None): Seconds an entry stays valid, None to never expire.
+        maxsize (int): Maximum number of entries kept before evicting the oldest.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one in-flight task.
+    Every caller awaiting a key gets the result (or exception) of that task.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield so one cancelled caller doesn't cancel the fetch for the others
+        return await asyncio.shield(task)
@@ -1,4 +1,6 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+import bson
+import logging
 import os
 from dotenv import load_dotenv
 
@@ -6,6 +8,11 @@ load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "agent_db")
+# Wire compression, negotiated with the server in order (zstd needs the zstandard package)
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,zlib")
 
-client = AsyncIOMotorClient(MONGO_URI)
+if not bson.has_c():
+    logging.warning("bson C extension not available, BSON encoding falls back to pure Python")
+
+client = AsyncIOMotorClient(MONGO_URI, compressors=MONGO_COMPRESSORS)
 db = client[MONGO_DB_NAME]
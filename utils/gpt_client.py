@@ -1,20 +1,17 @@
 import logging
 import asyncio
-import json
+import orjson
 import inspect
 from config import GPT_MODEL, tools, client
 from fastapi import HTTPException
 from utils.mongo_service import get_all_users
-from utils.x_api import get_token_price
+from utils.x_api import get_token_price_cached, get_token_prices, normalize_symbol
 import re
 from typing import Dict, Any
 
-async def create_gpt_messages(data: dict):
-    """
-    Analyze influencer tweets to detect and summarize token price predictions.
-    """
-  
-    system_prompt = """
+# System prompts are static so the message prefix stays byte-identical across
+# calls, which lets OpenAI's automatic prompt caching reuse it.
+_TWEET_SYSTEM_PROMPT = """
     You are an expert influencer tweet analyzer focused on crypto/finance/stocks price predictions.
 
     Your job:
@@ -68,34 +65,7 @@ async def create_gpt_messages(data: dict):
     - Keep JSON concise (≤ 600 characters).
     """
 
-    messages = [{"role": "system", "content": system_prompt}]
-
-    # user content (text + optional images)
-    user_content = [{"type": "text", "text": f"Tweet Data: {data}"}]
-
-    # If tweet has images, attach them as image_url
-    if "media_urls" in data:
-        for url in data["media_urls"]:
-            user_content.append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": url,
-                        "detail": "low"
-                    }
-                })
-
-
-    messages.append({"role": "user", "content": user_content})
-
-    return messages
-
-
-async def create_combined_predictions_messages(data: dict):
-    """
-    Analyze influencer tweets to detect and summarize token price predictions.
-    """
-  
-    system_prompt = """
+_COMBINED_SYSTEM_PROMPT = """
     You are an expert financial influencer prediction aggregator.
 
     You will be given structured tweet analysis data containing influencer tweets, prediction summaries, and metadata.
@@ -203,24 +173,130 @@ async def create_combined_predictions_messages(data: dict):
     }
     """
 
-    messages = [{"role": "system", "content": system_prompt}]
+_COMBINED_REDUCE_SYSTEM_PROMPT = """
+    You are an expert financial influencer prediction aggregator.
+
+    You will be given a list of partial aggregation results. Each was produced from a different
+    slice of the same tweet window and has the shape {"combined_predictions": [...]}.
+
+    Your job is to merge them into one final result:
+    - Group entries by agent_id (and user_wallet) and token.
+    - Merge supporting_influencers of the same group, keeping each account_name once.
+    - Re-apply the 50% rule: within each agent keep only influencers with influence_score >= 50% of that agent's maximum.
+    - If merged predictions conflict, select the narrative favored by the higher total influence weight.
+    - Recompute predicted_price, direction and confidence_score from the kept influencers and rewrite the reasoning.
+      **Don't mention the influence score/weight in reasoning**.
+    - Do not invent agents, tokens or influencers that are not present in the partial results.
+
+    Output must be strictly valid JSON (no extra text) in exactly the same format as the partial results:
+    {"combined_predictions": [{"agent_id": ..., "user_wallet": ..., "combined_prediction": {...}}]}
+    """
+
+# Links and @handles carry digits and capitals that say nothing about a prediction
+_NOISE_RE = re.compile(r"https?://\S+|@\w+")
+# Cashtags, price-shaped numbers (4k, 100k, 2.5m, 30%, $3) and market-direction words.
+# Kept loose on purpose: a tweet skipped here is stored as no-prediction and never analyzed again.
+_SIGNAL_RE = re.compile(
+    r"\$[A-Za-z]{2,6}\b|\$\d|\b\d+(?:[.,]\d+)?\s?(?:[km%]|\b)"
+    r"|\b(?:ath|atl|buy|buying|sell|selling)\b"
+    r"|\b(?:pump|dump|target|rally|crash|bull|bear|breakout|moon|double|price)\w*",
+    re.IGNORECASE
+)
+# Bare tickers ("ETH", "NVDA") are matched case-sensitively so ordinary words don't count
+_TICKER_RE = re.compile(r"\b[A-Z]{2,6}\b")
+# All-caps tweet slang that would otherwise pass as a ticker
+_TICKER_STOPWORDS = frozenset({
+    "AI", "AM", "BTW", "CEO", "DM", "FYI", "GG", "GM", "GN", "ICYMI", "IMHO", "IMO", "IRL",
+    "LFG", "LMAO", "LOL", "NGMI", "OK", "OMG", "PM", "RT", "TBH", "TV", "UK", "US", "USA",
+    "WAGMI", "WTF",
+})
+
+NO_SIGNAL_SUMMARY = {"is_prediction": False, "reason": "no signal tokens"}
+
+# Keyword arguments shared by every chat completion call
+_COMPLETION_KWARGS = {"model": GPT_MODEL, "tools": tools}
+_COMBINED_COMPLETION_KWARGS = {"model": "gpt-4.1-nano"}
+
+_TWEET_SYSTEM_MSG = {"role": "system", "content": _TWEET_SYSTEM_PROMPT}
+_COMBINED_SYSTEM_MSG = {"role": "system", "content": _COMBINED_SYSTEM_PROMPT}
+_COMBINED_REDUCE_SYSTEM_MSG = {"role": "system", "content": _COMBINED_REDUCE_SYSTEM_PROMPT}
+
+
+def has_prediction_signal(data: dict) -> bool:
+    """
+    Cheap prefilter run before tweet_analysis. Tweets with no cashtag, ticker,
+    price-shaped number or market word (ignoring links and @handles) are skipped;
+    tweets with images always pass, since a chart can carry the prediction on its own.
+
+    >>> [has_prediction_signal({"text": t}) for t in (
+    ...     "ETH at 4k", "BTC will hit 100k by Q4", "SOL to 300 soon",
+    ...     "Buy NVDA before earnings", "$PEPE looking ready", "Up 30% this week")]
+    [True, True, True, True, True, True]
+    >>> [has_prediction_signal({"text": t}) for t in (
+    ...     "Happy Friday everyone! https://t.co/aB3xYz9QkL", "GM frens",
+    ...     "LOL this is wild", "Long day at the office", "thanks @user42 for the love")]
+    [False, False, False, False, False]
+    """
+    if data.get("media_urls"):
+        return True
+    text = _NOISE_RE.sub(" ", data.get("text") or "")
+    if _SIGNAL_RE.search(text) is not None:
+        return True
+    return any(ticker not in _TICKER_STOPWORDS for ticker in _TICKER_RE.findall(text))
+
+
+async def create_gpt_messages(data: dict):
+    """
+    Analyze influencer tweets to detect and summarize token price predictions.
+    """
+
+    messages = [_TWEET_SYSTEM_MSG]
+
+    # user content (text + optional images)
     user_content = [{"type": "text", "text": f"Tweet Data: {data}"}]
+
+    # If tweet has images, attach them as image_url
+    if "media_urls" in data:
+        for url in data["media_urls"]:
+            user_content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": url,
+                        "detail": "low"
+                    }
+                })
+
+
+    messages.append({"role": "user", "content": user_content})
+
+    return messages
+
+
+async def create_combined_predictions_messages(data: dict, mode: str = "map"):
+    """
+    Analyze influencer tweets to detect and summarize token price predictions.
+    In "reduce" mode the data is a list of partial results to merge instead.
+    """
+
+    if mode == "reduce":
+        messages = [_COMBINED_REDUCE_SYSTEM_MSG]
+        user_content = [{"type": "text", "text": f"Partial Results: {data}"}]
+    else:
+        messages = [_COMBINED_SYSTEM_MSG]
+        user_content = [{"type": "text", "text": f"Tweet Data: {data}"}]
     messages.append({"role": "user", "content": user_content})
 
     return messages
 
 
-async def process_gpt_completion(messages, tools, model=GPT_MODEL):
+async def process_gpt_completion(messages, **overrides):
     """
-    Asynchronously process the GPT completion with the provided messages and tools.
+    Asynchronously process the GPT completion with the provided messages.
+    Model and tools default to _COMPLETION_KWARGS; pass keyword overrides to change them.
     """
+    kwargs = {**_COMPLETION_KWARGS, **overrides} if overrides else _COMPLETION_KWARGS
     try:
-        response = await asyncio.to_thread(
-            client.chat.completions.create,
-            model=model,
-            messages=messages,
-            tools=tools
-        )
+        response = await client.chat.completions.create(messages=messages, **kwargs)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing GPT completion: {str(e)}")
@@ -231,19 +307,19 @@ async def execute_tool_call(tool_call, data):
     Execute a single tool call and return its result.
     """
     try:
-        args = json.loads(tool_call.function.arguments)
-        logging.debug(f"Making tool call: {args}")
+        args = orjson.loads(tool_call.function.arguments)
+        logging.debug("Making tool call: %s", args)
 
         result = await _dispatch_tool_call(tool_call.function.name, args, data)
 
-        logging.info(f"Tool call result: {result}")
+        logging.info("Tool call result: %s", result)
         return {
             "tool_call_id": tool_call.id,
             "function_name": tool_call.function.name,
             "content": str(result) if result else "No data found."
         }
     except Exception as err:
-        logging.error(f"Error during tool call execution: {err}")
+        logging.error("Error during tool call execution: %s", err)
         if isinstance(err, HTTPException):
             raise err
         return {
@@ -260,7 +336,7 @@ async def _dispatch_tool_call(function_name, args, data):
         return await get_all_users()
     # Map other function names to their handlers
     tool_handlers = {
-        "get_token_price": lambda: get_token_price(args["symbol"]),
+        "get_token_price": lambda: get_token_price_cached(args["symbol"]),
         "get_all_users": handle_get_all_users,
     }
 
@@ -274,11 +350,34 @@ async def _dispatch_tool_call(function_name, args, data):
     return result
 
 
+async def prefetch_token_prices(tool_calls):
+    """
+    Fetch the prices of all get_token_price calls of a turn in one batch, so the
+    individual tool calls are served from the price cache.
+    """
+    symbols = []
+    for tool_call in tool_calls:
+        if tool_call.function.name != "get_token_price":
+            continue
+        try:
+            symbol = orjson.loads(tool_call.function.arguments).get("symbol")
+        except (orjson.JSONDecodeError, AttributeError):
+            continue  # reported by execute_tool_call
+        if symbol:
+            symbols.append(symbol)
+
+    if len(symbols) > 1:
+        await get_token_prices(symbols)
+
+
 async def handle_tool_calls(tool_calls, messages, data):
     """
     Handle multiple tool calls in parallel and update messages with responses.
     """
     try:
+        # Several price calls in one turn: warm the price cache with one batched request
+        await prefetch_token_prices(tool_calls)
+
         # Execute all tool calls in parallel
         tool_results = await asyncio.gather(
             *[execute_tool_call(tool_call, data) for tool_call in tool_calls]
@@ -295,50 +394,88 @@ async def handle_tool_calls(tool_calls, messages, data):
         return messages
 
     except Exception as err:
-        logging.error(f"Error during tool calls handling: {err}")
+        logging.error("Error during tool calls handling: %s", err)
         raise HTTPException(status_code=500, detail=f"Error processing function calls: {err}")
 
 
-async def tweet_analysis(data):
-    try:
-        messages = await create_gpt_messages(data)
-        completion = await process_gpt_completion(messages, tools)
-        assistant_message = completion.choices[0].message
+async def complete_with_tools(messages, data, shortcut=None, **overrides):
+    """
+    Run a completion, execute the tool calls it asks for and return the final content.
+    `shortcut(assistant_message, tool_messages)` may return a finished result,
+    which is returned as is instead of running the follow-up completion.
+    """
+    completion = await process_gpt_completion(messages, **overrides)
+    assistant_message = completion.choices[0].message
+    if not assistant_message.tool_calls:
+        return assistant_message.content
 
-        # handle tool calls
-        if assistant_message.tool_calls:
-            tool_calls = assistant_message.tool_calls
-            logging.info(f"Making tool calls: {tool_calls}")
+    tool_calls = assistant_message.tool_calls
+    logging.info("Making tool calls: %s", tool_calls)
 
-            messages.append({
-                "role": "assistant",
-                "content": None,
-                "tool_calls": [
-                    {
-                        "id": tool_call.id,
-                        "type": "function",
-                        "function": {
-                            "name": tool_call.function.name,
-                            "arguments": tool_call.function.arguments
-                        }
-                    } for tool_call in tool_calls
-                ]
-            })
+    # the SDK message already serializes to the shape the API expects back
+    messages.append(assistant_message.model_dump(exclude_none=True))
+    messages = await handle_tool_calls(tool_calls, messages, data)
+
+    if shortcut:
+        result = shortcut(assistant_message, messages[-len(tool_calls):])
+        if result is not None:
+            return result
+
+    final_completion = await process_gpt_completion(messages, **overrides)
+    return final_completion.choices[0].message.content
+
+
+def merge_price_draft(assistant_message, tool_messages):
+    """
+    If the first turn already returned the JSON summary and only asked for prices,
+    fill current_price locally so the second completion can be skipped.
+    Returns None when the follow-up completion is still needed.
+    """
+    if any(tc.function.name != "get_token_price" for tc in assistant_message.tool_calls):
+        return None
+
+    try:
+        draft = orjson.loads(assistant_message.content or "")
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(draft, dict):
+        return None
+
+    prices = {}
+    for tool_call, tool_message in zip(assistant_message.tool_calls, tool_messages):
+        try:
+            symbol = orjson.loads(tool_call.function.arguments).get("symbol", "")
+            prices[normalize_symbol(symbol)] = float(tool_message["content"])
+        except (orjson.JSONDecodeError, AttributeError, ValueError):
+            continue
+
+    token = normalize_symbol(draft.get("token") or "")
+    if token in prices:
+        draft["current_price"] = prices[token]
+    elif len(prices) == 1:
+        # a single lookup can only be for the draft's token, whatever it was called
+        draft["current_price"] = next(iter(prices.values()))
+    else:
+        # no lookup matches the token, so let the follow-up completion pick the price
+        return None
+    return draft
 
-            messages = await handle_tool_calls(tool_calls, messages, data)
-            final_completion = await process_gpt_completion(messages, tools)
-            response = final_completion.choices[0].message.content
-        else:
-            response = assistant_message.content
+
+async def tweet_analysis(data):
+    try:
+        messages = await create_gpt_messages(data)
+        response = await complete_with_tools(messages, data, shortcut=merge_price_draft)
+        if isinstance(response, dict):
+            return response
 
         if not response or response.strip() == "":
             return {"is_prediction": False, "reason": "empty GPT response"}
 
         # Try to parse the response
         try:
-            return json.loads(response)
+            return orjson.loads(response)
         except Exception as parse_err:
-            logging.warning(f"Initial JSON parse failed, attempting fixes: {parse_err}")
+            logging.warning("Initial JSON parse failed, attempting fixes: %s", parse_err)
             
             # Attempt 1: Simple cleanup
             try:
@@ -346,7 +483,7 @@ async def tweet_analysis(data):
                 
                 if cleaned_response.endswith('```'):
                         cleaned_response = cleaned_response[:-3].rstrip()
-                return json.loads(cleaned_response)
+                return orjson.loads(cleaned_response)
             except:
                 pass
             
@@ -373,10 +510,10 @@ async def tweet_analysis(data):
                 if fixed_response.endswith('```'):
                     fixed_response = fixed_response[:-3].strip()
                 
-                return json.loads(fixed_response)
+                return orjson.loads(fixed_response)
                 
             except Exception as fix_err:
-                logging.error(f"GPT fix also failed: {fix_err}")
+                logging.error("GPT fix also failed: %s", fix_err)
                 
                 # Final fallback: Extract what we can
                 return {
@@ -388,7 +525,7 @@ async def tweet_analysis(data):
 
 
     except Exception as error:
-        logging.error(f"Error processing user query: {error}", exc_info=True)
+        logging.error("Error processing user query: %s", error, exc_info=True)
         return {
             "is_prediction": False,
             "reason": f"Processing error: {str(error)}",
@@ -396,47 +533,20 @@ async def tweet_analysis(data):
         }
 
 
-async def combined_predictions_analysis(data):
+async def combined_predictions_analysis(data, mode: str = "map"):
     try:
-        messages = await create_combined_predictions_messages(data)
-        completion = await process_gpt_completion(messages, tools, model="gpt-4.1-nano")
-        assistant_message = completion.choices[0].message
-
-        # handle tool calls
-        if assistant_message.tool_calls:
-            tool_calls = assistant_message.tool_calls
-            logging.info(f"Making tool calls: {tool_calls}")
-
-            messages.append({
-                "role": "assistant",
-                "content": None,
-                "tool_calls": [
-                    {
-                        "id": tool_call.id,
-                        "type": "function",
-                        "function": {
-                            "name": tool_call.function.name,
-                            "arguments": tool_call.function.arguments
-                        }
-                    } for tool_call in tool_calls
-                ]
-            })
-
-            messages = await handle_tool_calls(tool_calls, messages, data)
-            final_completion = await process_gpt_completion(messages, tools, model="gpt-4.1-nano")
-            response = final_completion.choices[0].message.content
-        else:
-            response = assistant_message.content
+        messages = await create_combined_predictions_messages(data, mode)
+        response = await complete_with_tools(messages, data, **_COMBINED_COMPLETION_KWARGS)
 
         if not response or response.strip() == "":
             response = '{"is_prediction": false, "reason": "empty GPT response"}'
 
         try:
-            return json.loads(response)
+            return orjson.loads(response)
         except Exception as parse_err:
-            logging.error(f"Failed to parse GPT response: {response}, error: {parse_err}")
+            logging.error("Failed to parse GPT response: %s, error: %s", response, parse_err)
             return {"raw_response": response, "parse_error": str(parse_err)}
 
     except Exception as error:
-        logging.error(f"Error processing user query: {error}", exc_info=True)
+        logging.error("Error processing user query: %s", error, exc_info=True)
         return {"error": str(error), "status": "failed"}
\ No newline at end of file
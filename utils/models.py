@@ -1,12 +1,31 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import List, Optional
 from datetime import datetime
+import re
+import ciso8601
 
+# Legacy Twitter timestamp, e.g. "Wed Oct 10 20:19:24 +0000 2018"
+_TWITTER_DATE_RE = re.compile(r"^\w{3} (\w{3}) (\d{2}) (\d{2}):(\d{2}):(\d{2}) \+0000 (\d{4})$")
+_MONTHS = {m: i for i, m in enumerate(("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                       "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), start=1)}
+
+
+def _parse_twitter_date(value: str) -> Optional[datetime]:
+    match = _TWITTER_DATE_RE.match(value)
+    if not match or match.group(1) not in _MONTHS:
+        return None
+    month, day, hour, minute, second, year = match.groups()
+    try:
+        return datetime(int(year), _MONTHS[month], int(day), int(hour), int(minute), int(second))
+    except ValueError:
+        return None
 
 # -----------------------
 # Tweet
 # -----------------------
 class SummaryModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     is_prediction: bool
     token: Optional[str] = None
     predicted_price: Optional[float] = None
@@ -30,19 +49,19 @@ class TweetModel(BaseModel):
     summary: Optional[SummaryModel] = None
     prediction: bool = False
 
-    @validator("created_at", pre=True)
+    @field_validator("created_at", mode="before")
+    @classmethod
     def parse_datetime(cls, v):
         if isinstance(v, str):
+            # "Wed Oct 10 ..." has a space where ISO 8601 has the 4th year digit
+            if v[3:4] == " ":
+                return _parse_twitter_date(v) or datetime.utcnow()
+
+            # ISO 8601, including "Z" and "YYYY-MM-DD HH:MM:SS"
             try:
-                return datetime.fromisoformat(v.replace("Z", "+00:00"))
+                return ciso8601.parse_datetime(v)
             except ValueError:
-                try:
-                    return datetime.strptime(v, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    try:
-                        return datetime.strptime(v, "%a %b %d %H:%M:%S +0000 %Y")  # Twitter format
-                    except ValueError:
-                        return datetime.utcnow() 
+                return datetime.utcnow()
         elif v is None:
             return datetime.utcnow()  
         return v
@@ -63,6 +82,8 @@ class AccountModel(BaseModel):
 # User
 # -----------------------
 class AccountRefModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     username: str = Field(..., description="Twitter handle without @")
     influence: float = Field(..., ge=0, le=100, description="Influence score (0-100)")
 
@@ -94,6 +115,7 @@ class CombinedPredictionModel(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
-    @validator("updated_at", pre=True, always=True)
+    @field_validator("updated_at", mode="before")
+    @classmethod
     def set_updated(cls, v):
         return v or datetime.utcnow()
@@ -1,71 +1,134 @@
-import json
+import orjson
 import logging
+import ciso8601
 from utils.db import db
 from utils.db import db
+from utils.cache import TTLCache
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 from utils.models import CombinedPredictionModel, SummaryModel, UserModel, AccountModel, TweetModel, AccountRefModel,AgentModel
 from fastapi import HTTPException
-from pydantic import parse_obj_as
+from pydantic import TypeAdapter
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+# Account docs change rarely, so /influencer/search lookups are served from memory
+INFLUENCER_CACHE_TTL = 300
+influencer_cache = TTLCache(ttl=INFLUENCER_CACHE_TTL, maxsize=2048)
+
+# Ids polled by the hourly fetch job, dropped when an account is saved
+INFLUENCER_IDS_CACHE_TTL = 60
+influencer_ids_cache = TTLCache(ttl=INFLUENCER_IDS_CACHE_TTL, maxsize=1)
+
+# Agent views polled by the UI, dropped whenever the wallet's agents change
+USER_AGENTS_CACHE_TTL = 60
+user_agents_cache = TTLCache(ttl=USER_AGENTS_CACHE_TTL, maxsize=1024)
+
+# Old cached combined analyses are purged by Mongo itself
+PREDICTIONS_CACHE_EXPIRE_SECONDS = 7 * 24 * 3600
+PREDICTED_TWEETS_BATCH_SIZE = 100
+
+async def ensure_indexes():
+    """
+    Create the indexes the hot queries rely on. Safe to call on every startup.
+    """
+    indexes = [
+        (db.tweets, [("account_name", 1), ("tweet_id", 1)], {"unique": True, "name": "account_tweet"}),
+        (db.tweets, [("account_name", 1), ("created_at", -1)], {"name": "account_created_at"}),
+        (db.accounts, [("username", 1)], {"unique": True}),
+        (db.users, [("walletAddress", 1)], {"unique": True}),
+        (db.predictions_cache, [("hash", 1)], {"unique": True}),
+        (db.predictions_cache, [("created_at", 1)], {"expireAfterSeconds": PREDICTIONS_CACHE_EXPIRE_SECONDS}),
+    ]
+    for collection, keys, options in indexes:
+        try:
+            await collection.create_index(keys, **options)
+        except Exception as e:
+            logging.error("Failed to create index %s on %s: %s", keys, collection.name, e)
 
 # -----------------------
 # USER FUNCTIONS
 # -----------------------
+async def find_missing_accounts(usernames: List[str]) -> List[str]:
+    """
+    Return the usernames (in input order) that have no document in the
+    accounts collection, checked with a single $in query.
+    """
+    if not usernames:
+        return []
+    found = set(await db.accounts.distinct("username", {"username": {"$in": usernames}}))
+    return [username for username in usernames if username not in found]
+
 async def create_or_update_user_with_agent(data: dict):
     try:
-        wallet = data["walletAddress"]
+        # stored and cached under the same stripped wallet the update, delete and read paths use
+        wallet = data["walletAddress"].strip()
+        if not wallet:
+            raise ValueError("walletAddress is required")
         agent_name = data["agentName"]
         accounts = data.get("accounts", [])
         categories = data.get("categories", [])
 
-        account_refs = []
-        for acc in accounts:
-            username = acc["username"].strip().lower()
-            influence = acc["influence"]
-
-            # Ensure account exists in accounts collection
-            db_account = await db.accounts.find_one({"username": username})
-            if not db_account:
-                raise ValueError(
-                    f"Account with username '{username}' not found in accounts collection"
-                )
-
-            account_refs.append({"username": username, "influence": influence})
+        account_refs = [
+            {"username": acc["username"].strip().lower(), "influence": acc["influence"]}
+            for acc in accounts
+        ]
 
-        existing_user = await db.users.find_one({"walletAddress": wallet})
-
-        if not existing_user:
-            # New user with agent
-            new_user = UserModel(
-                walletAddress=wallet,
-                agents=[AgentModel(agent=agent_name, accounts=account_refs, categories=categories)],
-            ).dict()
-            await db.users.insert_one(new_user)
-            return {"status": "created", "user": sanitize_document(new_user)}
+        # Ensure all accounts exist in accounts collection
+        missing = await find_missing_accounts([ref["username"] for ref in account_refs])
+        if missing:
+            raise ValueError(
+                f"Account with username '{missing[0]}' not found in accounts collection"
+            )
 
-        # Ensure agents list exists
-        if "agents" not in existing_user or not isinstance(existing_user["agents"], list):
-            existing_user["agents"] = []
+        new_agent = AgentModel(agent=agent_name, accounts=account_refs, categories=categories).model_dump()
+        new_id = ObjectId()
+
+        # Doesn't rely on the unique walletAddress index for correctness (it may be
+        # missing on databases that already hold duplicate wallets). Appending only
+        # matches a user without this agent name; creating only inserts when no user
+        # has the wallet. Retried once for a wallet created concurrently.
+        status = None
+        for _ in range(2):
+            user = await db.users.find_one_and_update(
+                {"walletAddress": wallet, "agents.agent": {"$ne": agent_name}},
+                {"$push": {"agents": new_agent}},
+                return_document=ReturnDocument.AFTER
+            )
+            if user is not None:
+                status = "updated"
+                break
 
-        # Prevent duplicate agent names
-        for agent in existing_user["agents"]:
-            if agent["agent"] == agent_name:
+            try:
+                user = await db.users.find_one_and_update(
+                    {"walletAddress": wallet},
+                    {"$setOnInsert": {"_id": new_id, "agents": [new_agent], "created_at": datetime.utcnow()}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # a concurrent request inserted this wallet first
+                continue
+
+            if user["_id"] == new_id:
+                status = "created"
+                break
+            if any(agent.get("agent") == agent_name for agent in user.get("agents", [])):
                 raise ValueError(
                     f"Agent '{agent_name}' already exists for user with wallet '{wallet}'"
                 )
+            # the wallet was created concurrently without this agent, append to it
 
-        # If agent not found, add one
-        existing_user["agents"].append(
-            AgentModel(agent=agent_name, accounts=account_refs, categories=categories).dict()
-        )
+        if status is None:
+            raise RuntimeError(f"Concurrent updates kept changing user with wallet '{wallet}'")
 
-        await db.users.replace_one({"walletAddress": wallet}, existing_user)
-        return {"status": "updated", "user": sanitize_document(existing_user)}
+        user_agents_cache.delete(wallet)
+        return {"status": status, "user": sanitize_document(user)}
 
     except ValueError as ve:
         # Business validation error
-        logging.error(f"Validation error in create_or_update_user_with_agent: {ve}")
+        logging.error("Validation error in create_or_update_user_with_agent: %s", ve)
         raise
 
     except Exception as e:
@@ -111,6 +174,7 @@ async def update_user_agent(
 
     # --- Add accounts ---
     if add_accounts:
+        new_refs = []
         for acc in add_accounts:
             username_raw = acc.get("username") if isinstance(acc, dict) else acc
             username = normalize_username(username_raw)
@@ -118,11 +182,14 @@ async def update_user_agent(
                 raise ValueError("Invalid username in add_accounts")
 
             influence = acc.get("influence") if isinstance(acc, dict) else None
-            # validate account exists in accounts collection
-            db_account = await db.accounts.find_one({"username": username})
-            if not db_account:
-                raise ValueError(f"Account '{username}' not found in accounts collection")
+            new_refs.append((username, influence))
 
+        # validate accounts exist in accounts collection
+        missing = await find_missing_accounts([username for username, _ in new_refs])
+        if missing:
+            raise ValueError(f"Account '{missing[0]}' not found in accounts collection")
+
+        for username, influence in new_refs:
             if username not in existing_usernames_set:
                 agent.setdefault("accounts", []).append({"username": username, "influence": influence})
                 existing_usernames_set.add(username)
@@ -154,6 +221,7 @@ async def update_user_agent(
 
     # Save 
     await db.users.replace_one({"walletAddress": wallet}, existing_user)
+    user_agents_cache.delete(wallet)
 
     return sanitize_document(existing_user)
 
@@ -187,12 +255,18 @@ async def delete_user_agent(wallet: str, agent_name: str):
     # Save updated list
     existing_user["agents"] = updated_agents
     await db.users.replace_one({"walletAddress": wallet}, existing_user)
+    user_agents_cache.delete(wallet)
 
     return {
         "remaining_agents": [a.get("agent") for a in updated_agents]
     }
 
 async def get_user_agents(wallet: str) -> list:
+    wallet = wallet.strip()
+    cached = user_agents_cache.get(wallet)
+    if cached is not None:
+        return cached
+
     pipeline = [
         {"$match": {"walletAddress": wallet}},
         {"$unwind": "$agents"},
@@ -210,26 +284,22 @@ async def get_user_agents(wallet: str) -> list:
         {"$unwind": {"path": "$agents.accounts.account_info", "preserveNullAndEmptyArrays": True}},
 
         # lookup tweets (respect agent.created_at if present)
+        # usernames and account_name are both stored lowercased, so the join is a plain
+        # equality on the (account_name, created_at) index
         {
             "$lookup": {
                 "from": "tweets",
-                "let": {
-                    "uname": "$agents.accounts.username",
-                    "agent_created_at": "$agents.created_at"
-                },
+                "localField": "agents.accounts.username",
+                "foreignField": "account_name",
+                "let": {"agent_created_at": "$agents.created_at"},
                 "pipeline": [
                     {
                         "$match": {
+                            "prediction": True,
                             "$expr": {
-                                "$and": [
-                                    {"$eq": [{"$toLower": "$account_name"}, {"$toLower": "$$uname"}]},
-                                    {"$eq": ["$prediction", True]},
-                                    {
-                                        "$or": [
-                                            {"$eq": ["$$agent_created_at", None]},
-                                            {"$gte": ["$created_at", "$$agent_created_at"]}
-                                        ]
-                                    }
+                                "$or": [
+                                    {"$eq": ["$$agent_created_at", None]},
+                                    {"$gte": ["$created_at", "$$agent_created_at"]}
                                 ]
                             }
                         }
@@ -301,29 +371,33 @@ async def get_user_agents(wallet: str) -> list:
         }
     ]
 
+    # results are cached whole; the server's default batches drain it in the fewest round trips
     cursor = db.users.aggregate(pipeline)
     results = await cursor.to_list(length=None)
 
     if not results:
         raise ValueError(f"Wallet not exists")
 
+    user_agents_cache.set(wallet, results)
     return results
 
 async def get_all_unique_accounts_from_all_users() -> list:
     """
     Retrieve all unique accounts (by username) across all agents for all users.
     """
-    cursor = db.users.find({}, {"_id": 0, "agents.accounts": 1})
-    unique_accounts = {}
-
-    async for user in cursor:
-        for agent in user.get("agents", []):
-            for account in agent.get("accounts", []):
-                username = account["username"]
-                if username not in unique_accounts:
-                    unique_accounts[username] = account
+    # dedup runs in Mongo; only one document per username crosses the wire
+    pipeline = [
+        {"$project": {"_id": 0, "agents.accounts": 1}},
+        {"$unwind": "$agents"},
+        {"$unwind": "$agents.accounts"},
+        {"$group": {"_id": "$agents.accounts.username", "account": {"$first": "$agents.accounts"}}},
+        {"$replaceRoot": {"newRoot": "$account"}}
+    ]
+    cursor = db.users.aggregate(pipeline)
+    return [account async for account in cursor]
 
-    return list(unique_accounts.values())
+# Built once at import; parse_obj_as compiled a new validator for the list type on every call
+_users_adapter = TypeAdapter(List[UserModel])
 
 async def get_all_users() -> List[UserModel]:
     """
@@ -334,7 +408,16 @@ async def get_all_users() -> List[UserModel]:
     users = await users_cursor.to_list(length=None)  # fetch all docs
     
     # Validate & parse into Pydantic models
-    return parse_obj_as(List[UserModel], users)
+    return _users_adapter.validate_python(users)
+
+async def get_users_agent_configs() -> List[dict]:
+    """
+    Raw walletAddress/agents of every user, unvalidated, ordered by wallet.
+    Used to fingerprint the combined analysis inputs, so a malformed agent
+    document can't stop the job before the analysis runs.
+    """
+    cursor = db.users.find({}, {"_id": 0, "walletAddress": 1, "agents": 1}).sort("walletAddress", 1)
+    return await cursor.to_list(length=None)
 
 def serialize(obj):
     if isinstance(obj, list):
@@ -369,87 +452,124 @@ def sanitize_document(doc):
 # ACCOUNT FUNCTIONS
 # -----------------------
 
-async def save_tweet(account_name: str, tweet_data: dict, summary_data: Optional[dict] = None) -> dict:
-    try:
-        tweets_collection = db.tweets
-        tweet_id = str(tweet_data.get("id") or tweet_data.get("tweet_id"))
-        
-        if not tweet_id:
-            raise HTTPException(status_code=400, detail="Tweet must contain 'id' or 'tweet_id'")
-        
-        account_key = account_name.lower()
-        existing = await tweets_collection.find_one({
-            "account_name": account_key,
-            "tweet_id": tweet_id
-        })
-        
-        if existing:
-            return {"id": str(existing["_id"]), "status": "exists"}
-        
-        # Extract attachments as list of strings
-        raw_attachments = tweet_data.get("media_urls", [])
+def build_tweet_document(account_name: str, tweet_data: dict, summary_data: Optional[dict] = None) -> dict:
+    """
+    Build the tweets collection document for a raw X API tweet and its analysis.
+    """
+    tweet_id = str(tweet_data.get("id") or tweet_data.get("tweet_id"))
+
+    if not tweet_id:
+        raise HTTPException(status_code=400, detail="Tweet must contain 'id' or 'tweet_id'")
+
+    account_key = account_name.lower()
+
+    # Extract attachments as list of strings
+    raw_attachments = tweet_data.get("media_urls", [])
+    attachments = []
+
+    if isinstance(raw_attachments, dict):
+        # Use media_keys if dict
+        attachments = raw_attachments.get("media_urls", [])
+    elif isinstance(raw_attachments, list):
+        attachments = raw_attachments
+    else:
         attachments = []
-        
-        if isinstance(raw_attachments, dict):
-            # Use media_keys if dict
-            attachments = raw_attachments.get("media_urls", [])
-        elif isinstance(raw_attachments, list):
-            attachments = raw_attachments
-        else:
-            attachments = []
-        
-        # Parse summary if present
-        summary_obj = None
-        if summary_data:
-            if isinstance(summary_data, str):
-                summary_data = json.loads(summary_data)
-            summary_obj = SummaryModel(**summary_data)
-        
 
-        if summary_data:
-            try:
-                if isinstance(summary_data, str):
-                    summary_data = json.loads(summary_data)
-                summary_obj = SummaryModel(**summary_data)
-            except Exception as parse_err:
-                logging.error(f"Failed to parse summary_data: {summary_data}, error: {parse_err}")
-                summary_obj = summary_data  # keep raw if parsing fails
-  
-        # Handle created_at field conversion
-        created_at = tweet_data.get("created_at")
-        if isinstance(created_at, str):
-            try:
-                created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
-            except ValueError:
-                try:
-                    created_at = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    created_at = datetime.utcnow()
-        elif created_at is None:
+    # Parse summary if present
+    summary_obj = None
+    if summary_data:
+        if isinstance(summary_data, str):
+            summary_data = orjson.loads(summary_data)
+        summary_obj = SummaryModel(**summary_data)
+
+    # Handle created_at field conversion
+    created_at = tweet_data.get("created_at")
+    if isinstance(created_at, str):
+        try:
+            # also accepts the "%Y-%m-%d %H:%M:%S" form
+            created_at = ciso8601.parse_datetime(created_at)
+        except ValueError:
             created_at = datetime.utcnow()
-        
-        tweet = TweetModel(
-            tweet_id=tweet_id,
-            account_name=account_key,
-            text=tweet_data.get("text") or tweet_data.get("full_text", ""),
-            attachments=attachments,
-            created_at=created_at,
-            summary=summary_obj,
-            prediction=summary_obj.is_prediction if summary_obj else False
-        )
-        
-        # Convert to dict and handle datetime serialization for MongoDB
-        tweet_dict = tweet.dict()
-        if isinstance(tweet_dict.get("created_at"), datetime):
-            tweet_dict["created_at"] = tweet_dict["created_at"]
-        
-        result = await tweets_collection.insert_one(tweet_dict)
-        logging.info(f"Saved tweet for {account_name}: {tweet_id} with ID {result.inserted_id}")
-        return {"id": str(result.inserted_id), "status": "created"}
-        
+    elif created_at is None:
+        created_at = datetime.utcnow()
+
+    tweet = TweetModel(
+        tweet_id=tweet_id,
+        account_name=account_key,
+        text=tweet_data.get("text") or tweet_data.get("full_text", ""),
+        attachments=attachments,
+        created_at=created_at,
+        summary=summary_obj,
+        prediction=summary_obj.is_prediction if summary_obj else False
+    )
+    # null summary fields are left out of the stored document instead of written as None
+    return tweet.model_dump(exclude_none=True)
+
+async def save_tweet(account_name: str, tweet_data: dict, summary_data: Optional[dict] = None) -> dict:
+    """
+    Save a single tweet. Thin wrapper over save_tweets_bulk, so an existing
+    tweet is detected by the same upsert instead of a separate find_one.
+    """
+    result = await save_tweets_bulk([(account_name, tweet_data, summary_data)])
+    if result["status"] == "failed":
+        return {"error": result["error"], "status": "failed"}
+    if not result["keys"]:
+        return {"error": "Invalid tweet data", "status": "failed"}
+
+    upserted_ids = result.get("upserted_ids", {})
+    if upserted_ids:
+        return {"id": str(upserted_ids[0]), "status": "created"}
+    return {"id": None, "status": "exists"}
+
+async def save_tweets_bulk(records: List[tuple]) -> dict:
+    """
+    Save many tweets in a single bulk write.
+
+    Args:
+        records (list): (account_name, tweet_data, summary_data) tuples.
+
+    Returns:
+        dict: status plus the (account_name, tweet_id) keys that were written.
+    """
+    operations = []
+    keys = []
+    for account_name, tweet_data, summary_data in records:
+        try:
+            doc = build_tweet_document(account_name, tweet_data, summary_data)
+        except Exception as e:
+            logging.error("Error building tweet for %s: %s", account_name, e)
+            continue
+
+        key = {"account_name": doc["account_name"], "tweet_id": doc["tweet_id"]}
+        # $setOnInsert keeps an already stored tweet untouched
+        operations.append(UpdateOne(key, {"$setOnInsert": doc}, upsert=True))
+        keys.append((doc["account_name"], doc["tweet_id"]))
+
+    if not operations:
+        return {"status": "empty", "keys": []}
+
+    try:
+        result = await db.tweets.bulk_write(operations, ordered=False)
+        user_agents_cache.clear()
+        logging.info("Saved %s new tweets in bulk", result.upserted_count)
+        # upserted_ids maps the index of each newly inserted record to its _id
+        return {"status": "saved", "keys": keys, "upserted_ids": result.upserted_ids}
     except Exception as e:
-        logging.error(f"Error saving tweet for {account_name}: {str(e)}")
-        return {"error": str(e), "status": "failed"}
+        logging.error("Error saving tweets in bulk: %s", e)
+        return {"error": str(e), "status": "failed", "keys": []}
+
+async def find_existing_tweets(keys: List[tuple]) -> set:
+    """
+    Return which (account_name, tweet_id) pairs are already stored, in one query.
+    """
+    if not keys:
+        return set()
+
+    cursor = db.tweets.find(
+        {"$or": [{"account_name": account, "tweet_id": tweet_id} for account, tweet_id in keys]},
+        {"_id": 0, "account_name": 1, "tweet_id": 1}
+    )
+    return {(doc["account_name"], doc["tweet_id"]) async for doc in cursor}
 
 async def check_tweet_exists(account_name: str, tweet_id: str) -> dict:
     """
@@ -460,13 +580,14 @@ async def check_tweet_exists(account_name: str, tweet_id: str) -> dict:
         tweet_id = str(tweet_id)  # normalize
         account_key = account_name.lower()  # normalize
 
-        print(f"Checking tweet for {account_key}: {tweet_id}...")
+        logging.debug("Checking tweet for %s: %s...", account_key, tweet_id)
 
         tweets_collection = db.tweets
-        existing = await tweets_collection.find_one({
-            "account_name": account_key,
-            "tweet_id": tweet_id
-        })
+        # resolved through the unique (account_name, tweet_id) index, only _id comes back
+        existing = await tweets_collection.find_one(
+            {"account_name": account_key, "tweet_id": tweet_id},
+            {"_id": 1}
+        )
         # print(f"Existing tweet check for {account_key}: {tweet_id} - {existing is not None}")
 
         if existing:
@@ -474,7 +595,7 @@ async def check_tweet_exists(account_name: str, tweet_id: str) -> dict:
         return {"id": None, "status": "not_found"}
 
     except Exception as e:
-        print(f"Error checking tweet for {account_name}: {str(e)}")
+        logging.error("Error checking tweet for %s: %s", account_name, e)
         return {"error": str(e), "status": "failed"}
     
 async def save_account_info(account_data: dict):
@@ -494,7 +615,7 @@ async def save_account_info(account_data: dict):
     created_at_dt = None
     if account_data.get("created_at"):
         try:
-            created_at_dt = datetime.fromisoformat(account_data["created_at"].replace("Z", "+00:00"))
+            created_at_dt = ciso8601.parse_datetime(account_data["created_at"])
         except ValueError:
             pass  # ignore if parsing fails
 
@@ -516,22 +637,35 @@ async def save_account_info(account_data: dict):
         {"$set": update_data},
         upsert=True
     )
+    influencer_cache.delete(update_data["username"])
+    influencer_ids_cache.clear()
 
 async def get_all_unique_x_influencers_ids() -> List[str]:
     """
     Retrieve all unique X user IDs from the accounts collection.
-    Only returns non-null values.
+    Only returns well-formed numeric IDs; the filter runs in Mongo.
     """
-    user_ids = await db.accounts.distinct("x_user_id")
-    return [uid for uid in user_ids if uid]  # filter out None or empty strings
+    cached = influencer_ids_cache.get("ids")
+    if cached is not None:
+        return list(cached)
+
+    ids = await db.accounts.distinct("x_user_id", {"x_user_id": {"$regex": "^[0-9]+$"}})
+    influencer_ids_cache.set("ids", ids)
+    return list(ids)
 
 async def get_influencer_account_by_username(username: str) -> Optional[AccountModel]:
-    """Retrieve influencer account by username (case-insensitive)"""
+    """
+    Retrieve influencer account by username (case-insensitive).
+    Usernames are stored lowercased, so this is an indexed equality match.
+    """
     username = username.strip().lower()  # Normalize input
-    
-    # Case-insensitive search using $regex
+
+    cached = influencer_cache.get(username)
+    if cached is not None:
+        return cached
+
     doc = await db.accounts.find_one(
-        {"_id": {"$regex": f"^{username}$", "$options": "i"}},
+        {"username": username},
         {
             "_id": 1,
             "x_user_id": 1,
@@ -544,30 +678,33 @@ async def get_influencer_account_by_username(username: str) -> Optional[AccountM
             "last_fetched": 1
         }
     )
-    return AccountModel(**doc) if doc else None
+    if not doc:
+        return None
+
+    # documents are written by save_account_info already normalized, skip validation
+    account = AccountModel.model_construct(**doc)
+    influencer_cache.set(username, account)
+    return account
 
-async def get_last_24h_predicted_tweets() -> list:
+def _predicted_tweets_query() -> dict:
     since = datetime.utcnow() - timedelta(hours=72)
+    return {"prediction": True, "created_at": {"$gte": since}}
 
-    pipeline = [
-        {
-            "$match": {
-                "prediction": True,
-                "created_at": {"$gte": since}
-            }
-        },
-        {
-            "$sort": {"created_at": -1} 
-        },
-        {
-            "$project": {
-                "_id": 0  
-            }
-        }
-    ]
+async def get_last_24h_predicted_tweet_ids() -> List[str]:
+    """
+    Ids of the predicted tweets in the analysis window, without loading the documents.
+    """
+    cursor = db.tweets.find(_predicted_tweets_query(), {"_id": 0, "tweet_id": 1})
+    return [doc["tweet_id"] async for doc in cursor]
 
-    cursor = db.tweets.aggregate(pipeline)
-    return await cursor.to_list(length=None)
+def get_last_24h_predicted_tweets():
+    """
+    Cursor over the predicted tweets in the analysis window, newest first.
+    Only the fields the combined analysis reads are fetched, and the caller
+    consumes it in chunks instead of materializing the whole window.
+    """
+    projection = {"_id": 0, "tweet_id": 1, "account_name": 1, "text": 1, "created_at": 1, "summary": 1}
+    return db.tweets.find(_predicted_tweets_query(), projection).sort("created_at", -1).batch_size(PREDICTED_TWEETS_BATCH_SIZE)
 
 async def save_combined_predictions(res: dict) -> list:
     """
@@ -608,7 +745,7 @@ async def save_combined_predictions(res: dict) -> list:
                 "user_wallet": prediction.user_wallet,
                 "token": prediction.token
             }
-            update_data = prediction.dict()
+            update_data = prediction.model_dump()
             update_data["updated_at"] = datetime.utcnow()
 
             result = await collection.update_one(
@@ -621,9 +758,29 @@ async def save_combined_predictions(res: dict) -> list:
                 results.append({"status": "created", "id": str(result.upserted_id)})
             else:
                 results.append({"status": "updated"})
-            logging.info(f"Combined prediction saved")
+            logging.info("Combined prediction saved")
+        user_agents_cache.clear()
     except Exception as e:
-        logging.error(f"Error saving combined predictions: {str(e)}")
+        logging.error("Error saving combined predictions: %s", e)
         results.append({"error": str(e), "status": "failed"})
 
     return results
+
+async def get_cached_combined_analysis(input_hash: str, max_age: timedelta) -> Optional[dict]:
+    """
+    Return the combined analysis previously computed for the same inputs,
+    if it is younger than max_age.
+    """
+    doc = await db.predictions_cache.find_one(
+        {"hash": input_hash, "created_at": {"$gte": datetime.utcnow() - max_age}},
+        {"_id": 0, "analysis": 1}
+    )
+    return doc["analysis"] if doc else None
+
+async def save_combined_analysis_cache(input_hash: str, analysis: dict):
+    """Store a combined analysis keyed by the hash of its inputs."""
+    await db.predictions_cache.update_one(
+        {"hash": input_hash},
+        {"$set": {"analysis": analysis, "created_at": datetime.utcnow()}},
+        upsert=True
+    )
@@ -1,11 +1,199 @@
-import requests
+import asyncio
+import httpx
 import logging
-from typing import Optional
+import orjson
+import random
+import sys
+import time
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
 from config import X_BEARER_TOKEN
+from utils.cache import TTLCache, SingleFlight
 
 BASE_URL = "https://api.x.com/2"
 
-def get_user_info(username: str):
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=30)
+_HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+# httpx advertises br (brotli) and zstd in Accept-Encoding whenever their decoders are
+# installed, so both clients get compressed bodies without setting the header by hand
+
+# X API client: base URL and bearer token are set once instead of on every request
+X_CLIENT = httpx.AsyncClient(
+    base_url=BASE_URL,
+    headers={"Authorization": f"Bearer {X_BEARER_TOKEN}"},
+    http2=True,
+    limits=_HTTP_LIMITS,
+    timeout=_HTTP_TIMEOUT
+)
+
+# Price API hosts, each with its own connection pool so one slow provider can't take the others' connections
+PRICE_API_HOSTS = [
+    "https://api.binance.com",
+    "https://api.coingecko.com",
+    "https://min-api.cryptocompare.com",
+]
+_PRICE_HOST_LIMITS = httpx.Limits(max_keepalive_connections=16, max_connections=64, keepalive_expiry=30)
+
+# Shared HTTP/2 client for the price APIs, keeps their connections alive across calls
+HTTP_CLIENT = httpx.AsyncClient(
+    http2=True,
+    limits=_HTTP_LIMITS,
+    timeout=_HTTP_TIMEOUT,
+    mounts={
+        host: httpx.AsyncHTTPTransport(http2=True, limits=_PRICE_HOST_LIMITS)
+        for host in PRICE_API_HOSTS
+    }
+)
+
+# Prices asked for repeatedly within one GPT reasoning chain are served from memory
+PRICE_CACHE_TTL = 30
+_price_cache = TTLCache(ttl=PRICE_CACHE_TTL, maxsize=512)
+_price_flights = SingleFlight()
+# Providers still running this long after the race started (stalls, retries) are given up on
+PRICE_RACE_TIMEOUT = 5
+
+GECKO_COINS_TTL = 6 * 3600
+_gecko_coins_cache = TTLCache(ttl=GECKO_COINS_TTL, maxsize=1)
+
+BINANCE_TICKER_URL = "https://api.binance.com/api/v3/ticker/price"
+GECKO_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
+GECKO_PRICE_BY_ID_URL = GECKO_PRICE_URL + "?ids={coin_id}&vs_currencies=usd"
+CRYPTOCOMPARE_PRICE_URL = "https://min-api.cryptocompare.com/data/price?fsym={symbol}&tsyms=USD"
+
+# Which media field holds the image to show for each X media type
+MEDIA_URL_FIELDS = {"photo": "url", "video": "preview_image_url", "animated_gif": "preview_image_url"}
+
+RATE_LIMIT_WINDOW = 900
+# X rate limits are per endpoint; these are the keys their quotas are tracked under
+X_USER_BY_USERNAME = "/users/by/username/:username"
+X_USER_TWEETS = "/users/:id/tweets"
+
+# Query parameters that are the same on every call
+USER_INFO_PARAMS = {
+    "user.fields": "id,name,username,profile_image_url,verified,created_at"
+}
+USER_TWEETS_PARAMS = {
+    "tweet.fields": "author_id,created_at,text,attachments",
+    "expansions": "author_id,attachments.media_keys",
+    "exclude": "replies,retweets",
+    "user.fields": "username",
+    "media.fields": "url,preview_image_url,type"
+}
+
+# Transient failures worth another try: throttling and upstream errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.25
+RETRY_MAX_DELAY = 5
+
+
+class RateLimiter:
+    """
+    Tracks the X API quota from the x-rate-limit-* response headers and makes
+    callers wait for the reset only when the quota can't cover their requests.
+
+    Args:
+        window (int): Upper bound in seconds for a single wait (X uses 15 minute windows).
+    """
+
+    def __init__(self, window: int = RATE_LIMIT_WINDOW):
+        self.window = window
+        self.remaining: Optional[int] = None
+        self.reset: int = 0
+        # reset converted to time.monotonic() once, so waits survive wall-clock jumps
+        self.reset_at: float = 0
+        self._lock = asyncio.Lock()
+
+    def update(self, headers) -> None:
+        if "x-rate-limit-remaining" not in headers:
+            return
+        now = time.time()
+        remaining = int(headers["x-rate-limit-remaining"])
+        reset = int(headers.get("x-rate-limit-reset", now + self.window))
+        # responses of concurrent requests arrive out of order, keep the lowest count per window
+        if reset != self.reset or self.remaining is None or remaining < self.remaining:
+            self.remaining = remaining
+            self.reset = reset
+            self.reset_at = time.monotonic() + max(0, reset - now)
+
+    async def wait(self, needed: int = 1) -> None:
+        """
+        Sleep until the window resets if fewer than `needed` requests are left.
+        Only the first waiter sleeps; the others queue on the lock and find the quota reset.
+        """
+        async with self._lock:
+            if self.remaining is not None and self.remaining < needed:
+                sleep_for = min(max(0, self.reset_at - time.monotonic()), self.window)
+                logging.warning("Rate limit: %s requests left. Sleeping %.0fs for next window...", self.remaining, sleep_for)
+                await asyncio.sleep(sleep_for)
+                self.remaining = None
+
+# Last known X quota per endpoint: endpoint -> (remaining, reset epoch seconds)
+_x_limits: Dict[str, Tuple[int, float]] = {}
+
+def _record_x_limits(endpoint: str, headers) -> None:
+    if "x-rate-limit-remaining" in headers:
+        _x_limits[endpoint] = (
+            int(headers["x-rate-limit-remaining"]),
+            float(headers.get("x-rate-limit-reset", 0))
+        )
+
+def _x_quota_exhausted(endpoint: str) -> Optional[float]:
+    """Reset time of the endpoint's window if its quota is used up, None if calls can go out."""
+    remaining, reset = _x_limits.get(endpoint, (1, 0))
+    if remaining <= 0 and time.time() < reset:
+        return reset
+    return None
+
+def user_info_rate_limited() -> bool:
+    """True while the user lookup quota is used up and get_user_info skips calls."""
+    return _x_quota_exhausted(X_USER_BY_USERNAME) is not None
+
+def _json(response: httpx.Response):
+    """Decode a response body with orjson rather than httpx's stdlib json."""
+    return orjson.loads(response.content)
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds asked for by a Retry-After header (delta-seconds form), if any."""
+    value = response.headers.get("retry-after")
+    if value and value.isdigit():
+        return float(value)
+    return None
+
+async def get_with_retry(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+    """
+    GET through the given client, retrying transient statuses and transport
+    errors with exponential backoff and full jitter. A Retry-After header is
+    honored when it fits within RETRY_MAX_DELAY; a longer wait (or an exhausted
+    X quota) returns the response right away. The final response is returned
+    as is (callers still check its status); the final error is raised.
+    """
+    for attempt in range(RETRY_ATTEMPTS):
+        last_attempt = attempt == RETRY_ATTEMPTS - 1
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+        try:
+            response = await client.get(url, **kwargs)
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+
+            # the X quota only comes back at x-rate-limit-reset, which the RateLimiter handles
+            if response.headers.get("x-rate-limit-remaining") == "0":
+                return response
+
+            retry_after = _retry_after(response)
+            if retry_after is not None:
+                if retry_after > RETRY_MAX_DELAY:
+                    return response
+                delay = retry_after
+            logging.warning("GET %s returned %s, retrying", url, response.status_code)
+        except httpx.TransportError as e:
+            if last_attempt:
+                raise
+            logging.warning("GET %s failed: %s, retrying", url, e)
+
+        await asyncio.sleep(delay)
+
+async def get_user_info(username: str):
     """
     Fetch user info from X (Twitter) API by username.
 
@@ -15,204 +203,327 @@ def get_user_info(username: str):
     Returns:
         dict | None: User info JSON if successful, None otherwise.
     """
-    url = f"{BASE_URL}/users/by/username/{username}"
-    headers = {"Authorization": f"Bearer {X_BEARER_TOKEN}"}
-    params = {
-        "user.fields": "id,name,username,profile_image_url,verified,created_at"
-    }
+    url = f"/users/by/username/{username}"
+    if _x_quota_exhausted(X_USER_BY_USERNAME) is not None:
+        logging.warning("X quota for %s exhausted, skipping user info for %s", X_USER_BY_USERNAME, username)
+        return None
 
     try:
-        r = requests.get(url, headers=headers, params=params, timeout=10)  # 10s timeout
+        r = await get_with_retry(X_CLIENT, url, params=USER_INFO_PARAMS)
+        _record_x_limits(X_USER_BY_USERNAME, r.headers)
         r.raise_for_status()
-        return r.json()
-    except requests.exceptions.Timeout:
-        logging.error(f"Timeout fetching user info for {username}")
-    except requests.exceptions.HTTPError as e:
-        logging.error(f"HTTP error for {username}: {e.response.status_code} {e.response.text}")
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Request failed for {username}: {e}")
+        return _json(r)
+    except httpx.TimeoutException:
+        logging.error("Timeout fetching user info for %s", username)
+    except httpx.HTTPStatusError as e:
+        logging.error("HTTP error for %s: %s %s", username, e.response.status_code, e.response.text)
+    except httpx.HTTPError as e:
+        logging.error("Request failed for %s: %s", username, e)
 
     return None
 
-def get_user_tweets(user_id: str, max_results=5):
-    url = f"{BASE_URL}/users/{user_id}/tweets"
-    headers = {"Authorization": f"Bearer {X_BEARER_TOKEN}"}
-    params = {
-        "max_results": max_results,
-        "tweet.fields": "author_id,created_at,text,attachments",
-        "expansions": "author_id,attachments.media_keys",
-        "exclude": "replies,retweets",
-        "user.fields": "username",
-        "media.fields": "url,preview_image_url,type"
-    }
+async def get_user_tweets(user_id: str, max_results=5):
+    url = f"/users/{user_id}/tweets"
+    params = {**USER_TWEETS_PARAMS, "max_results": max_results}
+
+    reset = _x_quota_exhausted(X_USER_TWEETS)
+    if reset is not None:
+        # hand the known quota back so the caller's RateLimiter waits for the reset
+        logging.warning("X quota for %s exhausted, skipping tweets for %s", X_USER_TWEETS, user_id)
+        return [], {"x-rate-limit-remaining": "0", "x-rate-limit-reset": str(int(reset))}
 
     try:
-        r = requests.get(url, headers=headers, params=params, timeout=10)
+        r = await get_with_retry(X_CLIENT, url, params=params)
+        _record_x_limits(X_USER_TWEETS, r.headers)
         r.raise_for_status()
-        data = r.json()
+        data = _json(r)
 
         tweets = data.get("data", [])
-        users = {u["id"]: u["username"] for u in data.get("includes", {}).get("users", [])}
-        media_map = {m["media_key"]: m for m in data.get("includes", {}).get("media", [])}
+        includes = data.get("includes", {})
+        users = dict(map(itemgetter("id", "username"), includes.get("users", ())))
+        media_map = {m["media_key"]: m for m in includes.get("media", ())}
+        get_username, get_media = users.get, media_map.get
 
         for tweet in tweets:
-            tweet["username"] = users.get(tweet["author_id"], None)
-
-            if "attachments" in tweet and "media_keys" in tweet["attachments"]:
-                media_urls = []
-                for key in tweet["attachments"]["media_keys"]:
-                    media_item = media_map.get(key)
-                    if media_item:
-                        if media_item["type"] == "photo":
-                            media_urls.append(media_item.get("url"))
-                        elif media_item["type"] in ["video", "animated_gif"]:
-                            media_urls.append(media_item.get("preview_image_url"))
-                if media_urls:
-                    tweet["media_urls"] = media_urls
+            tweet["username"] = get_username(tweet["author_id"])
+
+            media_keys = tweet.get("attachments", {}).get("media_keys")
+            if not media_keys:
+                continue
+
+            # unknown media types map to a None field, which yields no URL
+            media_urls = [
+                url for url in (
+                    media.get(MEDIA_URL_FIELDS.get(media["type"]))
+                    for media in map(get_media, media_keys) if media
+                )
+                if url
+            ]
+            if media_urls:
+                tweet["media_urls"] = media_urls
 
         return tweets, r.headers
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Request failed for {user_id}: {e}")
+    except httpx.HTTPError as e:
+        logging.error("Request failed for %s: %s", user_id, e)
     except Exception as e:
-        logging.error(f"Unexpected error fetching tweets for {user_id}: {e}")
+        logging.error("Unexpected error fetching tweets for %s: %s", user_id, e)
 
     return [], {}
 
 
-def get_token_price_binance(symbol: str) -> Optional[float]:
+async def _binance_ticker(pair: str) -> Optional[float]:
+    """
+    Price of one Binance trading pair, or None if Binance doesn't list it.
+    """
+    response = await get_with_retry(HTTP_CLIENT, BINANCE_TICKER_URL, params={"symbol": pair}, timeout=5)
+    if response.status_code != 200:
+        return None
+    data = _json(response)
+    return float(data["price"]) if "price" in data else None
+
+async def _binance_tickers(pairs: List[str]) -> Optional[Dict[str, float]]:
+    """
+    Prices of several Binance trading pairs in one request, keyed by pair.
+    None if Binance rejects the batch, which it does (400) when any pair is unknown.
+    """
+    response = await get_with_retry(
+        HTTP_CLIENT,
+        BINANCE_TICKER_URL,
+        params={"symbols": '["' + '","'.join(pairs) + '"]'},
+        timeout=5
+    )
+    if response.status_code != 200:
+        return None
+    return {item["symbol"]: float(item["price"]) for item in _json(response)}
+
+async def get_token_price_binance(symbol: str) -> Optional[float]:
     """
     Improved Binance API version with better error handling
     """
-    symbol = symbol.upper() + "USDT"
-    url = f"https://api.binance.com/api/v3/ticker/price?symbol={symbol}"
+    base = symbol.upper()
     
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()  # Raise exception for bad status codes
-        
-        data = response.json()
-        
-        if "price" in data:
-            return float(data["price"])
-        else:
-            # Try alternative symbol format (without USDT)
-            alt_symbol = symbol.replace("USDT", "")
-            logging.warning(f"Price not found for {symbol}, trying alternative symbols...")
-            
-            # Try with different trading pairs
-            for pair in ["BUSD", "USDC", "BTC"]:
-                alt_url = f"https://api.binance.com/api/v3/ticker/price?symbol={alt_symbol}{pair}"
-                alt_response = requests.get(alt_url, timeout=5)
-                alt_data = alt_response.json()
-                
-                if "price" in alt_data:
-                    # If we get price in other pair, we might need to convert
-                    if pair != "USDT":
-                        # Get conversion rate (simplified approach)
-                        usdt_pair = f"{pair}USDT"
-                        conv_url = f"https://api.binance.com/api/v3/ticker/price?symbol={usdt_pair}"
-                        conv_response = requests.get(conv_url, timeout=5)
-                        conv_data = conv_response.json()
-                        
-                        if "price" in conv_data:
-                            return float(alt_data["price"]) * float(conv_data["price"])
-                    else:
-                        return float(alt_data["price"])
-            
-            logging.warning(f"Price not found for any trading pair of {symbol}")
-            return None
+        price = await _binance_ticker(f"{base}USDT")
+        if price is not None:
+            return price
+
+        # Try with different trading pairs, converted to USDT; one batch request if Binance lists them all
+        logging.warning("Price not found for %sUSDT, trying alternative symbols...", base)
+        quotes = ["BUSD", "USDC", "BTC"]
+        pairs = [f"{base}{quote}" for quote in quotes] + [f"{quote}USDT" for quote in quotes]
+        tickers = await _binance_tickers(pairs)
+        if tickers is None:
+            # an unlisted pair fails the whole batch, so probe each pair concurrently instead
+            results = await asyncio.gather(*(_binance_ticker(pair) for pair in pairs), return_exceptions=True)
+            tickers = {pair: price for pair, price in zip(pairs, results) if isinstance(price, float)}
+
+        # first pair in preference order that has both legs wins
+        for quote in quotes:
+            pair_price, rate = tickers.get(f"{base}{quote}"), tickers.get(f"{quote}USDT")
+            if pair_price is not None and rate is not None:
+                return pair_price * rate
+
+        logging.warning("Price not found for any trading pair of %s", base)
+        return None
             
-    except requests.exceptions.RequestException as e:
-        logging.error(f"API request failed: {e}")
+    except httpx.HTTPError as e:
+        logging.error("API request failed: %s", e)
         return None
     except ValueError as e:
-        logging.error(f"JSON parsing failed: {e}")
+        logging.error("JSON parsing failed: %s", e)
         return None
 
-def get_token_price_gecko(symbol: str) -> Optional[float]:
+async def get_gecko_coin_ids() -> Dict[str, str]:
+    """
+    CoinGecko symbol -> coin id map. The coin list is several MB and changes slowly,
+    so it is downloaded once per GECKO_COINS_TTL and shared by concurrent lookups.
+    """
+    coin_ids = _gecko_coins_cache.get("by_symbol")
+    if coin_ids is not None:
+        return coin_ids
+
+    async def fetch():
+        response = await get_with_retry(HTTP_CLIENT, "https://api.coingecko.com/api/v3/coins/list")
+        response.raise_for_status()
+        by_symbol = {}
+        for coin in _json(response):
+            # several coins share a symbol; keep the first, as the list scan did
+            by_symbol.setdefault(coin["symbol"].lower(), coin["id"])
+        _gecko_coins_cache.set("by_symbol", by_symbol)
+        return by_symbol
+
+    return await _price_flights.do("gecko:coins", fetch)
+
+async def get_token_price_gecko(symbol: str) -> Optional[float]:
     """
     Get token price using CoinGecko API
     """
     symbol = symbol.lower()
     
-    # First, get the coin ID from symbol
-    url = "https://api.coingecko.com/api/v3/coins/list"
     try:
-        response = requests.get(url, timeout=10)
-        coins = response.json()
-        
-        # Find coin by symbol
-        coin_id = None
-        for coin in coins:
-            if coin['symbol'].lower() == symbol:
-                coin_id = coin['id']
-                break
+        # /simple/price resolves the symbol itself; one small request covers most tokens
+        symbol_response = await get_with_retry(
+            HTTP_CLIENT,
+            GECKO_PRICE_URL,
+            params={"symbols": symbol, "vs_currencies": "usd"}
+        )
+        if symbol_response.status_code == 200:
+            symbol_data = _json(symbol_response)
+            if 'usd' in symbol_data.get(symbol, {}):
+                return symbol_data[symbol]['usd']
+
+        # Otherwise get the coin ID from the cached coin list
+        coin_ids = await get_gecko_coin_ids()
+        coin_id = coin_ids.get(symbol)
         
         if not coin_id:
-            logging.warning(f"Coin not found for symbol: {symbol}")
+            logging.warning("Coin not found for symbol: %s", symbol)
             return None
         
         # Get price data
-        price_url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd"
-        price_response = requests.get(price_url, timeout=10)
-        price_data = price_response.json()
+        price_url = GECKO_PRICE_BY_ID_URL.format(coin_id=coin_id)
+        price_response = await get_with_retry(HTTP_CLIENT, price_url)
+        if price_response.status_code != 200:
+            logging.warning("CoinGecko price request for %s returned %s", symbol, price_response.status_code)
+            return None
+        price_data = _json(price_response)
         
         if coin_id in price_data and 'usd' in price_data[coin_id]:
             return price_data[coin_id]['usd']
         else:
-            logging.warning(f"Price not found for {symbol}: {price_data}")
+            logging.warning("Price not found for %s: %s", symbol, price_data)
             return None
             
-    except requests.exceptions.RequestException as e:
-        logging.error(f"API request failed: {e}")
+    except httpx.HTTPError as e:
+        logging.error("API request failed: %s", e)
         return None
     except Exception as e:
-        logging.error(f"Unexpected error: {e}")
+        logging.error("Unexpected error: %s", e)
         return None
 
-def get_token_price_cryptocompare(symbol: str) -> Optional[float]:
+async def get_token_price_cryptocompare(symbol: str) -> Optional[float]:
     """
     Get token price using CryptoCompare API
     """
     symbol = symbol.upper()
-    url = f"https://min-api.cryptocompare.com/data/price?fsym={symbol}&tsyms=USD"
+    url = CRYPTOCOMPARE_PRICE_URL.format(symbol=symbol)
     
     try:
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        response = await get_with_retry(HTTP_CLIENT, url)
+        if response.status_code != 200:
+            logging.warning("CryptoCompare price request for %s returned %s", symbol, response.status_code)
+            return None
+        data = _json(response)
         
         if 'USD' in data:
             return data['USD']
         else:
-            logging.warning(f"Price not found for {symbol}: {data}")
+            logging.warning("Price not found for %s: %s", symbol, data)
             return None
             
-    except requests.exceptions.RequestException as e:
-        logging.error(f"API request failed: {e}")
+    except httpx.HTTPError as e:
+        logging.error("API request failed: %s", e)
         return None
     
-def get_token_price(symbol: str) -> Optional[float]:
+async def get_token_price(symbol: str) -> Optional[float]:
     """
-    Universal function that tries multiple APIs with fallback
+    Universal function that asks all price APIs at once and returns the first answer
     """
+    providers = {
+        "CryptoCompare": get_token_price_cryptocompare,
+        "Binance": get_token_price_binance,
+        "CoinGecko": get_token_price_gecko,
+    }
+    tasks = {asyncio.create_task(fetch(symbol)): name for name, fetch in providers.items()}
+    pending = set(tasks)
 
-    # Try CryptoCompare
-    price = get_token_price_cryptocompare(symbol)
-    if price is not None:
-        return price
-    
-    # Try Binance 
-    logging.info(f"Trying Binance for {symbol}")
-    price = get_token_price_binance(symbol)
+    deadline = time.monotonic() + PRICE_RACE_TIMEOUT
+
+    try:
+        # a provider that fails or doesn't know the symbol just leaves the race
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logging.warning("Price race for %s timed out after %ss", symbol, PRICE_RACE_TIMEOUT)
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and task.result() is not None:
+                    logging.debug("Price for %s from %s", symbol, tasks[task])
+                    return task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    logging.error("Could not get price for %s from any API", symbol)
+    return None
+
+def normalize_symbol(symbol: str) -> str:
+    """
+    Cashtags and case are normalized so "$btc" and "BTC" share a cache entry.
+    The result is interned, so repeated cache lookups compare keys by identity.
+    """
+    return sys.intern(symbol.strip().lstrip("$").upper())
+
+async def get_token_price_cached(symbol: str) -> Optional[float]:
+    """
+    Async get_token_price with a short TTL cache.
+    Concurrent lookups of the same symbol share a single fetch.
+    """
+    key = normalize_symbol(symbol)
+    price = _price_cache.get(key)
     if price is not None:
         return price
 
-    # Try CoinGecko
-    logging.info(f"Trying CoinGecko for {symbol}")
-    price = get_token_price_gecko(symbol)
-    if price is not None:
+    async def fetch():
+        price = await get_token_price(key)
+        if price is not None:
+            _price_cache.set(key, price)
         return price
-    
-    logging.error(f"Could not get price for {symbol} from any API")
-    return None
\ No newline at end of file
+
+    return await _price_flights.do(key, fetch)
+
+async def get_token_prices(symbols: List[str]) -> Dict[str, float]:
+    """
+    Get prices for several symbols at once.
+    Uncached symbols are asked from Binance in a single request; whatever Binance
+    doesn't list as a USDT pair falls back to the per-symbol lookup.
+
+    Returns:
+        dict: normalized symbol -> USD price, only for symbols that were found.
+    """
+    keys = list(dict.fromkeys(normalize_symbol(s) for s in symbols))
+    prices = {}
+    missing = []
+    for key in keys:
+        price = _price_cache.get(key)
+        if price is None:
+            missing.append(key)
+        else:
+            prices[key] = price
+
+    if not missing:
+        return prices
+
+    pairs = {f"{key}USDT": key for key in missing}
+    try:
+        tickers = await _binance_tickers(list(pairs))
+        for pair, price in (tickers or {}).items():
+            key = pairs.get(pair)
+            if key:
+                prices[key] = price
+                _price_cache.set(key, price)
+    except (httpx.HTTPError, ValueError) as e:
+        logging.warning("Batch price request failed: %s", e)
+
+    rest = [key for key in missing if key not in prices]
+    if rest:
+        results = await asyncio.gather(*(get_token_price_cached(key) for key in rest))
+        prices.update({key: price for key, price in zip(rest, results) if price is not None})
+
+    return prices
+
+async def close_http_client():
+    """Close the shared HTTP clients, their mounted transports and pooled connections."""
+    await asyncio.gather(X_CLIENT.aclose(), HTTP_CLIENT.aclose())